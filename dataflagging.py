@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 
+from functools import lru_cache
+from numbers import Integral
 import numpy as np
+from scipy.ndimage import convolve1d, uniform_filter1d
+from scipy.signal import fftconvolve
 
 __author__ = "Sebastian Kiehlmann"
 __credits__ = ["Sebastian Kiehlmann"]
@@ -14,7 +18,172 @@ __status__ = "Production"
 # FUNCTIONS
 #==============================================================================
 
-def mask_outliers(x, window_length, threshold):
+@lru_cache(maxsize=32)
+def _hann_window(window_length):
+    """Normalized Hann window.
+
+    Parameters
+    ----------
+    window_length : int
+        Width of the window.
+
+    Returns
+    -------
+    w : np.ndarray
+        Hann window normalized to unit sum. The array is cached and therefore
+        read-only.
+    """
+
+    w = np.hanning(window_length)
+    w /= w.sum()
+    w.setflags(write=False)
+
+    return w
+
+#==============================================================================
+
+def _check_window(window_length, kernel):
+    """Check the smoothing window arguments.
+
+    Parameters
+    ----------
+    window_length : int
+        Width of the smoothing window, see `mask_outliers()`.
+    kernel : str
+        Smoothing kernel, see `mask_outliers()`.
+
+    Raises
+    ------
+    ValueError
+        Raised, if `window_length` is not an integer.
+    ValueError
+        Raised, if `kernel` is neither 'hann' nor 'boxcar'.
+    ValueError
+        Raised, if `window_length` is even or too small for the `kernel`.
+
+    Returns
+    -------
+    window_length : int
+        Width of the smoothing window.
+    """
+
+    if not isinstance(window_length, Integral):
+        raise ValueError("`window_length` must be integer.")
+
+    window_length = int(window_length)
+
+    if kernel not in ['hann', 'boxcar']:
+        raise ValueError("`kernel` must be 'hann' or 'boxcar'.")
+
+    min_length = 5 if kernel == 'hann' else 3
+
+    if window_length < min_length or window_length % 2 == 0:
+        raise ValueError(
+                f"`window_length` must be odd and at least {min_length} for "
+                f"the {kernel} window.")
+
+    return window_length
+
+#==============================================================================
+
+def _check_dtype(dtype):
+    """Check the computing precision argument.
+
+    Parameters
+    ----------
+    dtype : data-type or None
+        Floating point precision, see `mask_outliers()`.
+
+    Raises
+    ------
+    ValueError
+        Raised, if `dtype` is neither None, np.float32, nor np.float64.
+
+    Returns
+    -------
+    None
+    """
+
+    if dtype is not None and dtype not in [np.float32, np.float64]:
+        raise ValueError("`dtype` must be None, np.float32, or np.float64.")
+
+#==============================================================================
+
+def _mask_outliers_core(x, window_length, threshold, kernel, dtype):
+    """Identify outliers.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Time-sorted data sequence or sequences. Sequences are stored along the
+        last axis and are treated independently.
+    window_length : int
+        Width of the smoothing window, see `mask_outliers()`.
+    threshold : float
+        Threshold for detecting outliers, see `mask_outliers()`.
+    kernel : str
+        Smoothing kernel, 'hann' or 'boxcar', see `mask_outliers()`.
+    dtype : data-type or None
+        Floating point precision of the computation, see `mask_outliers()`.
+
+    Returns
+    -------
+    outlier : np.ndarray (dtype: bool)
+        Items are True if a value in the input `x` is considered an outliers;
+        False otherwise.
+    """
+
+    # empty data sequences contain no outliers:
+    if x.shape[-1] == 0:
+        return np.zeros(x.shape, dtype=bool)
+
+    # computing precision:
+    if dtype is None:
+        dtype = x.dtype if x.dtype in [np.float32, np.float64] else np.float64
+
+    dtype = np.dtype(dtype)
+
+    # the mean of each sequence is subtracted before reducing the precision;
+    # the residuals do not depend on a constant offset, because the smoothing
+    # kernels are normalized:
+    if dtype != x.dtype and dtype.itemsize < 8:
+        x = x - x.mean(axis=-1, keepdims=True, dtype=np.float64)
+
+    x = x.astype(dtype, copy=False)
+
+    # smoothed data:
+    # running mean for boxcar window:
+    if kernel == 'boxcar':
+        x_smoothed = uniform_filter1d(x, window_length, axis=-1, mode='mirror')
+
+    # Hann window:
+    else:
+        w = _hann_window(window_length).astype(dtype, copy=False)
+
+        # direct convolution for short windows, FFT for long windows:
+        if window_length <= 128:
+            x_smoothed = convolve1d(x, w, axis=-1, mode='mirror')
+        else:
+            pad = [(0, 0)] * (x.ndim-1) + [(window_length//2,) * 2]
+            s = np.pad(x, pad, mode='reflect')
+            w = w.reshape((1,) * (x.ndim-1) + (-1,))
+            x_smoothed = fftconvolve(s, w, mode='valid', axes=-1)
+
+    # residuals, computed in place of the smoothed data:
+    x_res = np.subtract(x, x_smoothed, out=x_smoothed)
+    np.absolute(x_res, out=x_res)
+    mean_res = x_res.mean(axis=-1, keepdims=True)
+
+    # identify outliers:
+    outlier = x_res > threshold * mean_res
+
+    return outlier
+
+#==============================================================================
+
+def mask_outliers(
+        x, window_length, threshold, kernel='hann', dtype=None,
+        return_indices=False):
     """Identify outliers.
 
     Parameters
@@ -22,49 +191,138 @@ def mask_outliers(x, window_length, threshold):
     x : array-like
         Time-sorted data sequence.
     window_length : int
-        Defines the width of the Hann window function that is used to calculate
-        a smoothed data curve.
+        Defines the width of the window function that is used to calculate a
+        smoothed data curve. Must be odd, so that the window is centered on
+        each data point, and at least 5 for the Hann window or at least 3 for
+        the boxcar window. The Hann window of length 3 has zero weights
+        except for the center and would not smooth the data.
     threshold : float
         Threshold for detecting outliers. Residuals that are larger than the
         mean residual value times this threshold factor are considered
         outliers.
+    kernel : str, optional
+        Smoothing window function, either 'hann' or 'boxcar'. The boxcar
+        window uses a running mean, whose computing time does not depend on
+        the window length. It is recommended for large `window_length` and
+        long data sequences. The default is 'hann'.
+    dtype : data-type, optional
+        Floating point precision used for smoothing and residuals. If None,
+        the precision of `x` is kept for float32 and float64 input; other
+        input is computed in double precision (np.float64). Setting
+        np.float32 for double precision input halves the memory traffic,
+        which speeds up long data sequences, at the cost of a relative
+        precision of about 1e-7 in the smoothed data and residuals. The mean
+        of `x` is subtracted before the conversion, so a large constant
+        offset does not reduce the precision further. Values very close to
+        the threshold may still be flagged differently than with double
+        precision. The default is None.
+    return_indices : bool, optional
+        If True, the indices of the outliers are returned instead of a boolean
+        mask. The default is False.
 
     Raises
     ------
     ValueError
         Raised, if `window_length` is not an integer.
+    ValueError
+        Raised, if `window_length` is even or too small for the `kernel`.
+    ValueError
+        Raised, if `kernel` is neither 'hann' nor 'boxcar'.
+    ValueError
+        Raised, if `dtype` is neither None, np.float32, nor np.float64.
 
     Returns
     -------
-    outlier : np.ndarray (dtype: bool)
+    outlier : np.ndarray (dtype: bool or int)
         Items are True if a value in the input `x` is considered an outliers;
-        False otherwise.
+        False otherwise. If `return_indices` is True, the indices of the
+        outliers.
     """
 
     # check input:
     x = np.asarray(x)
 
-    if not isinstance(window_length, int):
-        raise ValueError("`window_length` must be integer.")
+    window_length = _check_window(window_length, kernel)
+    _check_dtype(dtype)
 
-    # smoothed data:
-    s = np.r_[x[window_length-1:0:-1], x, x[-2:-window_length-1:-1]]
-    w = np.hanning(window_length)
-    n = int(np.floor(window_length/2))
-    x_smoothed = np.convolve(w/w.sum(), s, mode='valid')[n:-n]
+    outlier = _mask_outliers_core(
+            x, window_length, threshold, kernel, dtype)
 
-    # residuals:
-    x_res = np.absolute(x - x_smoothed)
-    mean_res = x_res.mean()
+    if return_indices:
+        outlier = np.flatnonzero(outlier)
 
-    # identify outliers:
-    outlier = x_res > threshold * mean_res
+    return outlier
+
+#==============================================================================
+
+def mask_outliers_batch(
+        x, window_length, threshold, kernel='hann', dtype=None):
+    """Identify outliers in multiple data sequences of equal length.
+
+    Parameters
+    ----------
+    x : array-like
+        Two-dimensional array of time-sorted data sequences. Each row is one
+        sequence.
+    window_length : int
+        Defines the width of the window function that is used to calculate a
+        smoothed data curve. Must be odd, so that the window is centered on
+        each data point, and at least 5 for the Hann window or at least 3 for
+        the boxcar window. The Hann window of length 3 has zero weights
+        except for the center and would not smooth the data.
+    threshold : float
+        Threshold for detecting outliers. Residuals that are larger than the
+        mean residual value of the same sequence times this threshold factor
+        are considered outliers.
+    kernel : str, optional
+        Smoothing window function, either 'hann' or 'boxcar', see
+        `mask_outliers()`. The default is 'hann'.
+    dtype : data-type, optional
+        Floating point precision used for smoothing and residuals, see
+        `mask_outliers()`. The default is None.
+
+    Raises
+    ------
+    ValueError
+        Raised, if `x` is not two-dimensional.
+    ValueError
+        Raised, if `window_length` is not an integer.
+    ValueError
+        Raised, if `window_length` is even or too small for the `kernel`.
+    ValueError
+        Raised, if `kernel` is neither 'hann' nor 'boxcar'.
+    ValueError
+        Raised, if `dtype` is neither None, np.float32, nor np.float64.
+
+    Returns
+    -------
+    outlier : np.ndarray (dtype: bool)
+        Two-dimensional array. Items are True if a value in the input `x` is
+        considered an outliers; False otherwise.
+
+    Notes
+    -----
+    The result is identical to calling `mask_outliers()` on each row, but all
+    sequences are smoothed in a single vectorized convolution.
+    """
+
+    # check input:
+    x = np.asarray(x)
+
+    if x.ndim != 2:
+        raise ValueError("`x` must be two-dimensional.")
+
+    window_length = _check_window(window_length, kernel)
+    _check_dtype(dtype)
+
+    outlier = _mask_outliers_core(
+            x, window_length, threshold, kernel, dtype)
 
     return outlier
 
 #==============================================================================
 
-def mask_largeunc(x_unc, threshold):
+def mask_largeunc(x_unc, threshold, return_indices=False):
     """Identify large uncertainties.
 
     Parameters
@@ -75,19 +333,29 @@ def mask_largeunc(x_unc, threshold):
         Threshold for detecting large uncertainties. Uncertainties that are
         larger than the mean uncertainty times this threshold factor are
         considered large.
+    return_indices : bool, optional
+        If True, the indices of the large uncertainties are returned instead of
+        a boolean mask. The default is False.
 
     Returns
     -------
-    large_unc : np.ndarray (dtype: bool)
+    large_unc : np.ndarray (dtype: bool or int)
         Items are True if a value in the input `x_unc` is considered a large
-        uncertainty; False otherwise.
+        uncertainty; False otherwise. If `return_indices` is True, the indices
+        of the large uncertainties.
     """
 
-    x_unc = np.asarray(x_unc)
+    if type(x_unc) is not np.ndarray:
+        x_unc = np.asarray(x_unc)
 
-    mean_unc = x_unc.mean()
+    mean_unc = np.add.reduce(
+            x_unc, dtype=np.result_type(x_unc.dtype, np.float64)) \
+        / x_unc.size
     large_unc = x_unc > threshold * mean_unc
 
+    if return_indices:
+        large_unc = np.flatnonzero(large_unc)
+
     return large_unc
 
 #==============================================================================
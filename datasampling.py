@@ -10,11 +10,133 @@ __maintainer__ = "Sebastian Kiehlmann"
 __email__ = "skiehlmann@mail.de"
 __status__ = "Production"
 
+#==============================================================================
+# CLASSES
+#==============================================================================
+
+class TimeSeries:
+    """Time marks with cached derived quantities.
+
+    Wrapping the time marks in a TimeSeries lets `smart_binning()` and
+    `split_data()` share the time differences instead of recomputing them on
+    every call. The time marks must not be modified after the instance is
+    created.
+    """
+
+    #--------------------------------------------------------------------------
+    def __init__(self, time):
+        """Create a TimeSeries instance.
+
+        Parameters
+        ----------
+        time : array-like
+            Time marks.
+
+        Returns
+        -------
+        None
+        """
+
+        self.time = np.asarray(time)
+        self._diffs = None
+
+    #--------------------------------------------------------------------------
+    @property
+    def diffs(self):
+        """Differences between consecutive time marks.
+
+        The differences are computed on first access and cached.
+
+        Returns
+        -------
+        diffs : np.ndarray
+            Differences between consecutive time marks.
+        """
+
+        if self._diffs is None:
+            self._diffs = np.diff(self.time)
+
+        return self._diffs
+
 #==============================================================================
 # FUNCTIONS
 #==============================================================================
 
-def smart_binning(time, interval, verbose=0, recursion=0):
+def _check_sorted(diffs):
+    """Check that time is sorted increasingly.
+
+    Parameters
+    ----------
+    diffs : np.ndarray
+        Differences between consecutive time marks.
+
+    Raises
+    ------
+    ValueError
+        Raised if the time marks are not sorted increasingly.
+
+    Returns
+    -------
+    None
+    """
+
+    if diffs.size and diffs.min() < 0:
+        raise ValueError("The provided time are not sorted increasingly.")
+
+#==============================================================================
+
+def _interval_std(time, starts, stops):
+    """Standard deviations of time marks within intervals.
+
+    The time marks of the intervals are gathered in chunks of at most the
+    size of `time` and the standard deviations are computed in two passes
+    (mean, then squared deviations), which is numerically stable.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Time marks.
+    starts : np.ndarray
+        Start indices of the intervals.
+    stops : np.ndarray
+        Stop indices of the intervals.
+
+    Returns
+    -------
+    std : np.ndarray
+        Standard deviation of the time marks in each interval.
+    """
+
+    length = stops - starts
+    std = np.empty(length.shape[0])
+    cum_length = np.cumsum(length)
+    splits = np.searchsorted(
+            cum_length, np.arange(time.shape[0], cum_length[-1],
+                                  time.shape[0]), side='right')
+    splits = np.r_[0, splits, length.shape[0]]
+
+    for chunk_start, chunk_stop in zip(splits[:-1], splits[1:]):
+        if chunk_start == chunk_stop:
+            continue
+
+        chunk_length = length[chunk_start:chunk_stop]
+        offsets = np.zeros(chunk_length.shape[0], dtype=int)
+        np.cumsum(chunk_length[:-1], out=offsets[1:])
+        gathered = time[
+                np.arange(chunk_length.sum())
+                + np.repeat(starts[chunk_start:chunk_stop] - offsets,
+                            chunk_length)]
+        mean = np.add.reduceat(gathered, offsets) / chunk_length
+        gathered -= np.repeat(mean, chunk_length)
+        np.square(gathered, out=gathered)
+        std[chunk_start:chunk_stop] = np.sqrt(
+                np.add.reduceat(gathered, offsets) / chunk_length)
+
+    return std
+
+#==============================================================================
+
+def smart_binning(time, interval, verbose=0):
     """Find data binning intervals.
 
     Iteratively finds ranges of time-sorted data, where the data falls into a
@@ -23,7 +145,7 @@ def smart_binning(time, interval, verbose=0, recursion=0):
 
     Parmeters
     ---------
-    time : array-like
+    time : array-like or TimeSeries
         Sorted time marks.
     interval : float
         The length of the interval, in which data points are considered to be
@@ -31,9 +153,6 @@ def smart_binning(time, interval, verbose=0, recursion=0):
     verbose : int, optional
         If zero, no information is printed. Otherwise, information about the
         identified intervals is printed. The default is 0.
-    recursion : int, optional
-        Defines the current recursion level. This argument is required for the
-        algorithm. Do not set a value different from 0. The default is 0.
 
     Raises
     ------
@@ -49,86 +168,93 @@ def smart_binning(time, interval, verbose=0, recursion=0):
         IDs of data points that do not need to be binned.
     """
 
-    time = np.asarray(time)
+    if not isinstance(time, TimeSeries):
+        time = TimeSeries(time)
 
-    # check that time is sorted increasingly:
-    if np.any(np.diff(time) < 0):
-        raise ValueError("The provided time are not sorted increasingly.")
+    _check_sorted(time.diffs)
+    time = time.time
 
     if len(time) < 2:
         return [], False
 
-    # first, find all intervals:
-    intervals = []
-
-    # iterate through time values:
-    for i, value in enumerate(time):
-        # iterate backwards throuch preceding values:
-        j = i-1
-
-        while j>=0 and time[j] > value - interval:
-            j -= 1
-        else:
-            # replace latest interval with extended interval:
-            if j+1 < i and len(intervals)>0 and intervals[-1][0] == j+1:
-                intervals[-1] = [j+1, i+1]
-            # add new interval:
-            elif j+1 < i:
-                intervals.append([j+1, i+1])
-
-    if len(intervals) == 0:
-        if recursion == 0:
-            return [], np.arange(time.shape[0])
-        else:
-            return False, False
-
-    # second, find best interval:
-    spreading = []
-
-    for inter in intervals:
-        spreading.append(np. std(time[inter[0]:inter[1]]))
-
-    index = spreading.index(min(spreading))
-    bin_ids_cur = np.arange(intervals[index][0], intervals[index][1])
-
-    # third, recursion on preceeding time:
-    time_pre = time[:bin_ids_cur[0]]
-    bin_ids_pre, __ = smart_binning(time_pre, interval, recursion=recursion+1)
-
-    # fourth, recursion on succeeding time:
-    time_suc = time[bin_ids_cur[-1]+1:]
-    bin_ids_suc, __ = smart_binning(time_suc, interval, recursion=recursion+1)
-
-    # fifth, join indices lists:
-    if bin_ids_pre:
-        bin_ids = bin_ids_pre
-        bin_ids.append(bin_ids_cur)
-    else:
-        bin_ids = [bin_ids_cur]
-
-    if bin_ids_suc:
-        # adjust indices:
-        add = bin_ids_cur[-1]+1
-        for inter in bin_ids_suc:
-            bin_ids.append(inter +add)
-
-    # determine data points that do not need binning:
-    if recursion == 0:
-        binned_ids = np.concatenate(bin_ids)
-        unbinned_ids = []
-
-        for i in np.arange(time.shape[0]):
-            if not i in binned_ids:
-                unbinned_ids.append(i)
-
-        unbinned_ids = np.array(unbinned_ids)
-        n_unbinned = unbinned_ids.shape[0]
-
-    else:
-        unbinned_ids = None
+    bins = []
+    segments = [(0, time.shape[0])]
+
+    # iterate through data segments, starting with the full data:
+    while segments:
+        seg_start, seg_stop = segments.pop()
+        segment = time[seg_start:seg_stop]
+
+        if segment.shape[0] < 2:
+            continue
+
+        # first, find all intervals:
+        # for each time value find the first index within the preceding
+        # interval:
+        first = np.searchsorted(segment, segment - interval, side='right')
+        last = np.flatnonzero(first < np.arange(segment.shape[0]))
+
+        if last.shape[0] == 0:
+            continue
+
+        # intervals with the same start are merged into the longest one:
+        first = first[last]
+        longest = np.empty(first.shape[0], dtype=bool)
+        np.not_equal(first[1:], first[:-1], out=longest[:-1])
+        longest[-1] = True
+        starts = first[longest]
+        stops = last[longest] + 1
+
+        # second, find best interval, i.e. the one with the smallest standard
+        # deviation:
+        # variances are computed from cumulative sums of the centered time
+        # marks:
+        centered = segment - segment.mean()
+        cumsum = np.zeros(segment.shape[0]+1)
+        cumsum2 = np.zeros(segment.shape[0]+1)
+        np.cumsum(centered, out=cumsum[1:])
+        np.cumsum(np.square(centered, out=centered), out=cumsum2[1:])
+        length = stops - starts
+        mean = (cumsum[stops] - cumsum[starts]) / length
+        variance = (cumsum2[stops] - cumsum2[starts]) / length - mean * mean
+
+        # the cumulative sums are affected by round-off errors, intervals
+        # whose variance is within the error bound of the minimum are
+        # candidates for the best interval:
+        tolerance = segment.shape[0] * np.finfo(float).eps * cumsum2[-1] \
+            + 1e-9 * interval**2
+        candidates = np.flatnonzero(variance <= variance.min() + tolerance)
+
+        # the exact spreading of the candidates decides; the first interval is
+        # chosen among those with equal spreading, where differences below a
+        # billionth of the interval are considered equal:
+        spreading = _interval_std(
+                segment, starts[candidates], stops[candidates])
+        index = candidates[np.flatnonzero(
+                spreading <= spreading.min() + 1e-9 * interval)[0]]
+        bin_start = seg_start + starts[index]
+        bin_stop = seg_start + stops[index]
+        bins.append((bin_start, bin_stop))
+
+        # third, continue with succeeding and preceding time:
+        segments.append((bin_stop, seg_stop))
+        segments.append((seg_start, bin_start))
+
+    # join indices lists in time order:
+    bins.sort()
+    bin_ids = [np.arange(bin_start, bin_stop) for bin_start, bin_stop in bins]
+
+    # determine data points that do not need binning, i.e. the gaps between
+    # the sorted bins:
+    bin_starts, bin_stops = np.array(bins, dtype=int).reshape(-1, 2).T
+    gap_starts = np.r_[0, bin_stops]
+    gap_lengths = np.r_[bin_starts, time.shape[0]] - gap_starts
+    n_unbinned = gap_lengths.sum()
+    gap_offsets = gap_starts - np.cumsum(gap_lengths) + gap_lengths
+    unbinned_ids = np.arange(n_unbinned) + np.repeat(gap_offsets, gap_lengths)
 
     # print information:
-    if verbose:
+    if verbose and bin_ids:
         n = [len(ids) for ids in bin_ids]
         print(f'{len(bin_ids)} bins found.')
         print('time points per bin:')
@@ -147,7 +273,7 @@ def split_data(time, gap):
 
     Parameters
     ----------
-    time : array-like
+    time : array-like or TimeSeries
         Sorted time marks.
     gap : float
         Gap length threshold. The data is split when the time interval between
@@ -156,26 +282,25 @@ def split_data(time, gap):
     Returns
     -------
     out : list
-        List of arrays containing indices to the split data sets.
+        List of slices selecting the split data sets.
     """
 
-    time = np.asarray(time)
+    if not isinstance(time, TimeSeries):
+        time = TimeSeries(time)
 
-    # check that time is sorted increasingly:
-    if np.any(np.diff(time) < 0):
-        raise ValueError("The provided time are not sorted increasingly.")
+    diffs = time.diffs
+    _check_sorted(diffs)
+    time = time.time
 
     if len(time) < 2:
         return []
 
     # identify large gaps:
-    split = np.r_[0, np.nonzero(np.diff(data)>gap)[0] + 1, len(data)]
-    indices = []
+    split = np.r_[0, np.flatnonzero(diffs > gap) + 1, time.shape[0]].tolist()
 
-    # prepare list of indices to the split data sets:
-    for start, stop in zip(split[:-1], split[1:]):
-        indices.append(np.arange(start, stop))
+    # prepare list of slices to the split data sets:
+    slices = [slice(start, stop) for start, stop in zip(split[:-1], split[1:])]
 
-    return indices
+    return slices
 
 #==============================================================================
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from dataflagging import mask_largeunc, mask_outliers, mask_outliers_batch
+
+#==============================================================================
+# FUNCTIONS
+#==============================================================================
+
+def _data():
+    """Smooth data sequence with two spikes at indices 50 and 120."""
+
+    rng = np.random.default_rng(0)
+    x = np.sin(np.linspace(0., 6., 200)) + rng.normal(0., 0.01, 200)
+    x[[50, 120]] += 1.
+
+    return x
+
+#==============================================================================
+# TESTS
+#==============================================================================
+
+def test_mask_outliers_return_indices():
+    """Indices of the outliers match the boolean mask."""
+
+    x = _data()
+    outlier = mask_outliers(x, 5, 5.)
+    indices = mask_outliers(x, 5, 5., return_indices=True)
+
+    assert outlier.dtype == bool
+    assert indices.tolist() == np.flatnonzero(outlier).tolist()
+    assert 50 in indices and 120 in indices
+
+#==============================================================================
+
+def test_mask_largeunc_return_indices():
+    """Indices of the large uncertainties match the boolean mask."""
+
+    x_unc = [1., 1., 1., 10., 1.]
+
+    assert mask_largeunc(x_unc, 2.).tolist() == [
+            False, False, False, True, False]
+    assert mask_largeunc(x_unc, 2., return_indices=True).tolist() == [3]
+
+#==============================================================================
+
+def test_mask_outliers_boxcar():
+    """The boxcar window flags the spikes and matches a running mean."""
+
+    x = _data()
+    outlier = mask_outliers(x, 7, 5., kernel='boxcar')
+
+    assert outlier[50] and outlier[120]
+
+    # reference running mean with mirrored edges:
+    padded = np.pad(x, 3, mode='reflect')
+    x_smoothed = np.convolve(padded, np.ones(7) / 7., mode='valid')
+    x_res = np.absolute(x - x_smoothed)
+
+    assert outlier.tolist() == (x_res > 5. * x_res.mean()).tolist()
+
+#==============================================================================
+
+def test_mask_outliers_batch():
+    """Each row of the batch is flagged as by mask_outliers()."""
+
+    x = np.stack([_data(), _data()[::-1], np.sin(np.linspace(0., 3., 200))])
+
+    for window_length in [5, 201]:
+        for kernel in ['hann', 'boxcar']:
+            outlier = mask_outliers_batch(
+                    x, window_length, 3., kernel=kernel)
+            single = mask_outliers_batch(
+                    x[:1], window_length, 3., kernel=kernel)
+
+            assert outlier.shape == x.shape
+            assert single[0].tolist() == outlier[0].tolist()
+
+            for row, outlier_row in zip(x, outlier):
+                assert outlier_row.tolist() == mask_outliers(
+                        row, window_length, 3., kernel=kernel).tolist()
+
+#==============================================================================
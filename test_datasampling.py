@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from datasampling import TimeSeries, smart_binning, split_data
+
+#==============================================================================
+# TESTS
+#==============================================================================
+
+def test_smart_binning_even_sampling():
+    """Intervals with equal spreading are resolved in favor of the first."""
+
+    bin_ids, unbinned_ids = smart_binning(np.arange(5.), 2.5)
+
+    assert [ids.tolist() for ids in bin_ids] == [[0, 1, 2], [3, 4]]
+    assert unbinned_ids.tolist() == []
+
+#==============================================================================
+
+def test_smart_binning_even_sampling_offset():
+    """Ties are not decided by round-off errors for large time values."""
+
+    time = 58000. + 0.1 * np.arange(5)
+    bin_ids, unbinned_ids = smart_binning(time, 0.25)
+
+    assert [ids.tolist() for ids in bin_ids] == [[0, 1, 2], [3, 4]]
+    assert unbinned_ids.tolist() == []
+
+#==============================================================================
+
+def test_split_data():
+    """Data is split into slices at gaps larger than the threshold."""
+
+    time = np.array([0., 1., 2., 10., 11., 30.])
+    slices = split_data(time, 3.)
+
+    assert slices == [slice(0, 3), slice(3, 5), slice(5, 6)]
+    assert time[slices[1]].tolist() == [10., 11.]
+
+#==============================================================================
+
+def test_split_data_no_gap():
+    """Data without large gaps is returned as a single slice."""
+
+    assert split_data([0., 1., 2.], 3.) == [slice(0, 3)]
+    assert split_data([0.], 3.) == []
+
+#==============================================================================
+
+def test_timeseries_input():
+    """TimeSeries input gives the same results as array input."""
+
+    time = np.array([0., 1., 2., 10., 11., 30., 31., 32., 33.])
+    time_series = TimeSeries(time)
+
+    assert time_series.diffs is time_series.diffs
+    assert split_data(time_series, 3.) == split_data(time, 3.)
+
+    bin_ids, unbinned_ids = smart_binning(time_series, 2.)
+    bin_ids_ref, unbinned_ids_ref = smart_binning(time, 2.)
+
+    assert [ids.tolist() for ids in bin_ids] \
+        == [ids.tolist() for ids in bin_ids_ref]
+    assert unbinned_ids.tolist() == unbinned_ids_ref.tolist()
+
+#==============================================================================
+
+def test_timeseries_unsorted():
+    """Unsorted TimeSeries input raises ValueError."""
+
+    time_series = TimeSeries([0., 2., 1.])
+
+    for func, arg in [(split_data, 3.), (smart_binning, 2.)]:
+        try:
+            func(time_series, arg)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("ValueError not raised.")
+
+#==============================================================================